@@ -5,13 +5,25 @@ A multi-user real-time button clicking game built with Flask and Socket.IO
 with improved architecture, error handling, and performance optimizations.
 """
 
-from flask import Flask, send_from_directory, jsonify, request as flask_request
+# Make sockets, threading and sleep cooperative before anything imports them
+import eventlet
+eventlet.monkey_patch()
+
+from flask import Flask, send_from_directory, jsonify, session, request as flask_request
 from flask_socketio import SocketIO, emit
+import orjson
 import os
+import atexit
+import gzip
+import hashlib
+import itertools
 import socket
 import time
 import logging
+import secrets
 import threading
+from array import array
+from collections import OrderedDict, deque
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -51,19 +63,68 @@ def setup_logging(config_obj):
 # Global variables for the enhanced app
 app = None
 socketio = None
+_sio_server = None  # Underlying python-socketio server for fan-out broadcasts
 data_manager = None
 rate_limiter = None
 connection_limiter = None
 button_state = {}
+click_counter = None
 achievements_data = {}
 stats_data = {}
+user_sessions = OrderedDict()  # LRU of session_client_id -> session info, not persisted
+# Per-process prefix keeps ids saved by clients of an earlier run from colliding
+_session_prefix = secrets.token_hex(4)
+_session_ids = itertools.count(1)  # next() is atomic, no lock needed
 logger = None
 app_config = None
+button_state_dirty = None
+stats_dirty = None
+_next_stats_flush = 0.0  # Monotonic time before which stats-only changes stay in memory
+
+# Coalesced update_state broadcasts
+_pending_broadcast = False
+_last_broadcast_ts = 0.0  # time.monotonic() of the last broadcast
+_state_payload_key = None
+_state_payload = None  # button_state pre-encoded as an orjson.Fragment
+
+# Health metrics: process start and a bounded window of recent click times
+_app_start = time.monotonic()
+_recent_clicks = deque(maxlen=1024)
+
+# Landing page, read and precompressed once at startup
+_index_html = b''
+_index_gz = b''
+
+# Version counters for cached API responses, bumped when the data mutates
+_stats_ver = 0
+_ach_ver = 0
+_stats_response = None  # (cache key, body, etag)
+_ach_response = None
+
+# Cached local hour of day, recomputed only when the hour rolls over
+_cur_hour_idx = 0
+_next_hour_ts = 0.0
+_next_day_ts = 0.0  # Next local midnight; clicks past it roll the daily stats first
+
+class OrjsonPacketJSON:
+    """orjson-backed json module for encoding and decoding Socket.IO packets"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # orjson output is already compact, so separators are not needed
+        return orjson.dumps(obj, default=list).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
 
 def initialize_app(config_name: Optional[str] = None):
     """Initialize the Flask application and all components"""
-    global app, socketio, data_manager, rate_limiter, connection_limiter
-    global button_state, achievements_data, stats_data, logger, app_config
+    global app, socketio, _sio_server, data_manager, rate_limiter, connection_limiter
+    global button_state, achievements_data, stats_data, user_sessions, logger, app_config
+    global button_state_dirty, stats_dirty, click_counter, _index_html, _index_gz, _app_start
+    
+    _app_start = time.monotonic()
     
     # Determine config
     config_name = config_name or os.environ.get('FLASK_ENV', 'default')
@@ -76,6 +137,12 @@ def initialize_app(config_name: Optional[str] = None):
     # Create Flask app
     app = Flask(__name__)
     app.config.from_object(app_config)
+    app.use_x_sendfile = app_config.USE_X_SENDFILE
+    
+    # The landing page is static, so compress it once instead of per request
+    with open(os.path.join(app.root_path, 'index.html'), 'rb') as f:
+        _index_html = f.read()
+    _index_gz = gzip.compress(_index_html, compresslevel=9, mtime=0)
     
     # Initialize SocketIO with proper configuration
     socketio = SocketIO(
@@ -83,8 +150,10 @@ def initialize_app(config_name: Optional[str] = None):
         cors_allowed_origins=app_config.CORS_ORIGINS,
         ping_timeout=60,
         ping_interval=25,
-        max_http_buffer_size=1024*1024  # 1MB limit
+        max_http_buffer_size=1024*1024,  # 1MB limit
+        json=OrjsonPacketJSON
     )
+    _sio_server = socketio.server
     
     # Initialize components
     data_manager = DataManager(app_config)
@@ -95,16 +164,45 @@ def initialize_app(config_name: Optional[str] = None):
     button_state = data_manager.load_button_state()
     achievements_data = data_manager.load_achievements() if app_config.ENABLE_ACHIEVEMENTS else {}
     stats_data = data_manager.load_stats() if app_config.ENABLE_STATS else {}
+    user_sessions = OrderedDict()
+    
+    # Guarantee the keys the handlers index directly
+    button_state.setdefault('count', 0)
+    if app_config.ENABLE_STATS:
+        stats_data.setdefault('clicks_today', 0)
+        stats_data.setdefault('unique_users', 0)
+        if len(stats_data.get('clicks_per_hour', ())) != 24:
+            stats_data['clicks_per_hour'] = array('Q', [0] * 24)
+    
+    # Dirty flags: button_state_dirty means the click log holds events the
+    # snapshots don't, stats_dirty means stats changed outside of clicks
+    button_state_dirty = threading.Event()
+    stats_dirty = threading.Event()
+    
+    # Recover clicks logged after the last compaction, then start a clean log
+    data_manager.replay_click_log(button_state, stats_data if app_config.ENABLE_STATS else None)
+    data_manager.compact_click_log(button_state, stats_data if app_config.ENABLE_STATS else None)
+    click_counter = itertools.count(button_state['count'] + 1)
     
     logger.info(f"Application started with {config_name} configuration")
-    logger.info(f"Initial button count: {button_state.get('count', 0)}")
+    logger.info(f"Initial button count: {button_state['count']}")
     
-    # Background cleanup task
+    # Background flush and cleanup task
     def cleanup_task():
-        """Periodic cleanup task"""
+        """Periodic flush of dirty state and cleanup task"""
+        last_cleanup = last_compaction = time.time()
         while True:
             try:
-                time.sleep(300)  # Run every 5 minutes
+                socketio.sleep(app_config.FLUSH_INTERVAL)
+                compact = time.time() - last_compaction >= app_config.COMPACTION_INTERVAL
+                if compact:
+                    last_compaction = time.time()
+                flush_dirty_state(compact)
+                
+                # Run cleanup every 5 minutes
+                if time.time() - last_cleanup < 300:
+                    continue
+                last_cleanup = time.time()
                 rate_limiter.cleanup_old_entries()
                 
                 # Create backup if enabled
@@ -114,9 +212,86 @@ def initialize_app(config_name: Optional[str] = None):
             except Exception as e:
                 logger.error(f"Error in cleanup task: {e}")
     
-    # Start background cleanup thread
-    cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
-    cleanup_thread.start()
+    # Start background cleanup task
+    socketio.start_background_task(cleanup_task)
+    
+    # Start coalescing broadcaster
+    socketio.start_background_task(broadcast_task)
+    
+    # Don't lose the last batch of clicks on shutdown
+    atexit.register(flush_dirty_state, True)
+
+def flush_dirty_state(compact: bool = False):
+    """Flush the click log, rewriting the snapshots when compacting or stats changed"""
+    global _next_stats_flush
+    
+    # Stats-only changes are written behind, at most once per STATS_FLUSH_INTERVAL
+    now = time.monotonic()
+    stats_due = stats_dirty.is_set() and (compact or now >= _next_stats_flush)
+    if stats_due or (compact and button_state_dirty.is_set()):
+        _next_stats_flush = now + app_config.STATS_FLUSH_INTERVAL
+        # Clear before writing so clicks arriving mid-write mark the state dirty again
+        button_state_dirty.clear()
+        stats_dirty.clear()
+        if not data_manager.compact_click_log(button_state, stats_data if app_config.ENABLE_STATS else None):
+            button_state_dirty.set()
+            stats_dirty.set()
+            logger.error("Failed to save button state and stats")
+    elif not data_manager.flush_click_log():
+        logger.error("Failed to flush click log")
+
+def flush_broadcast():
+    """Send the latest button state to all clients if a broadcast is pending"""
+    global _pending_broadcast, _last_broadcast_ts
+    if not _pending_broadcast:
+        return
+    _pending_broadcast = False
+    _last_broadcast_ts = time.monotonic()
+    # Skip Flask-SocketIO's wrapper; broadcasts need no request context
+    _sio_server.emit('update_state', state_payload(), namespace='/')
+
+def state_payload():
+    """Return button_state encoded once per change, embedded as-is in packets"""
+    global _state_payload_key, _state_payload
+    key = (button_state['count'], button_state.get('last_updated'))
+    if key != _state_payload_key:
+        _state_payload = orjson.Fragment(orjson.dumps(button_state))
+        _state_payload_key = key
+    return _state_payload
+
+def current_hour() -> int:
+    """Return the local hour of day without building a datetime per call"""
+    global _cur_hour_idx, _next_hour_ts
+    now = time.time()
+    if now >= _next_hour_ts:
+        local = time.localtime(now)
+        _cur_hour_idx = local.tm_hour
+        # Track the local boundary so half-hour UTC offsets roll over correctly
+        _next_hour_ts = int(now) - local.tm_min * 60 - local.tm_sec + 3600
+    return _cur_hour_idx
+
+def roll_daily_stats():
+    """Reset the daily stats once the local date changes, invalidating cached responses"""
+    global _stats_ver, _next_day_ts
+    if data_manager.roll_daily_stats(stats_data):
+        _stats_ver += 1
+    _next_day_ts = data_manager.next_day_ts
+
+def broadcast_task():
+    """Emit at most one update_state per broadcast interval under click floods"""
+    while True:
+        try:
+            socketio.sleep(app_config.BROADCAST_INTERVAL)
+            flush_broadcast()
+        except Exception as e:
+            logger.error(f"Error in broadcast task: {e}")
+
+def cached_json_response(body: bytes, etag: str):
+    """Serve a prebuilt JSON body with an ETag, answering If-None-Match with 304"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=1'
+    return response.make_conditional(flask_request)
 
 # Initialize the app
 initialize_app()
@@ -125,7 +300,14 @@ initialize_app()
 @app.route('/')
 def home():
     """Serve the main HTML page"""
-    return send_from_directory('.', 'index.html')
+    # Index by name for the quality: 'in' would also match 'gzip;q=0'
+    gzipped = flask_request.accept_encodings['gzip'] > 0
+    response = app.response_class(_index_gz if gzipped else _index_html, mimetype='text/html')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
 
 @app.route('/<path:path>')
 def serve_static(path):
@@ -137,88 +319,107 @@ def get_stats():
     """API endpoint for statistics data"""
     if not app_config.ENABLE_STATS:
         return jsonify({"error": "Stats disabled"}), 404
-        
-    # Update stats before returning
-    current_hour = datetime.now().hour
-    if "clicks_per_hour" in stats_data and current_hour < len(stats_data["clicks_per_hour"]):
-        stats_data["clicks_per_hour"][current_hour] = button_state.get("count", 0)
-    return jsonify(stats_data)
+    
+    # Re-serialize only when stats changed since the cached body was built;
+    # roll_daily_stats() bumps the version when the day turns over
+    global _stats_response
+    roll_daily_stats()
+    hour = current_hour()
+    key = (_stats_ver, hour, stats_data.get("last_updated"))
+    if _stats_response is None or _stats_response[0] != key:
+        # Update stats before returning
+        stats_data["clicks_per_hour"][hour] = button_state["count"]
+        body = orjson.dumps(stats_data, default=list)
+        _stats_response = (key, body, hashlib.blake2s(body, digest_size=8).hexdigest())
+    return cached_json_response(_stats_response[1], _stats_response[2])
 
 @app.route('/api/achievements')
 def get_achievements():
     """API endpoint for achievements data"""
     if not app_config.ENABLE_ACHIEVEMENTS:
         return jsonify({"error": "Achievements disabled"}), 404
-    return jsonify(achievements_data)
+    
+    global _ach_response
+    key = (_ach_ver, achievements_data.get("last_updated"))
+    if _ach_response is None or _ach_response[0] != key:
+        body = orjson.dumps(achievements_data, default=list)
+        _ach_response = (key, body, hashlib.blake2s(body, digest_size=8).hexdigest())
+    return cached_json_response(_ach_response[1], _ach_response[2])
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
+    # Click times are appended in order, so only the newest ones need checking
+    now = time.monotonic()
+    clicks_last_second = 0
+    for clicked_at in reversed(_recent_clicks):
+        if clicked_at <= now - 1:
+            break
+        clicks_last_second += 1
+    
     return jsonify({
         "status": "healthy",
         "version": "2.0",
-        "uptime": time.time() - button_state.get("last_updated", time.time()),
+        "uptime": now - _app_start,
+        "clicks_per_sec": clicks_last_second,
         "connections": connection_limiter.get_connection_count(),
-        "button_count": button_state.get("count", 0)
+        "button_count": button_state["count"]
     })
 
 # Socket.IO event handlers
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    from flask import session
-    import uuid
+    global _stats_ver
     
     # Generate a unique client ID
     if 'client_id' not in session:
-        session['client_id'] = str(uuid.uuid4())
+        session['client_id'] = secrets.token_urlsafe(12)
     client_id = session['client_id']
     
     # Check connection limit
-    if not connection_limiter.can_connect(client_id):
+    if not (connection_limiter.can_connect(client_id)
+            and connection_limiter.add_connection(client_id)):
         logger.warning(f"Connection rejected due to limits: {client_id}")
         return False
-        
-    connection_limiter.add_connection(client_id)
     
     # Send current state to the newly connected client
-    emit('update_state', button_state)
+    emit('update_state', state_payload())
     
     # Generate session ID for client tracking
-    session_client_id = f"client_{time.time()}_{len(stats_data.get('user_sessions', {}))}"
+    session_client_id = f"client_{_session_prefix}_{next(_session_ids)}"
     emit('set_client_id', {'client_id': session_client_id})
     
     # Update user stats if enabled
     if app_config.ENABLE_STATS:
-        stats_data["unique_users"] = stats_data.get("unique_users", 0) + 1
-        if "user_sessions" not in stats_data:
-            stats_data["user_sessions"] = {}
-        stats_data["user_sessions"][session_client_id] = {
+        stats_data["unique_users"] += 1
+        _stats_ver += 1
+        user_sessions[session_client_id] = {
             "first_connected": time.time(),
             "clicks": 0,
             "socket_id": client_id
         }
-        data_manager.save_stats(stats_data)
+        # Evict the least recently active session once over capacity
+        if len(user_sessions) > app_config.MAX_TRACKED_SESSIONS:
+            user_sessions.popitem(last=False)
+        stats_dirty.set()
     
-    logger.info(f"Client connected: {client_id}. Current count: {button_state.get('count', 0)}")
+    logger.info(f"Client connected: {client_id}. Current count: {button_state['count']}")
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    from flask import session
     client_id = session.get('client_id', 'unknown')
     connection_limiter.remove_connection(client_id)
     logger.info(f"Client disconnected: {client_id}")
 
-@socketio.on('button_click')
-def handle_button_click(data=None):
-    """Handle button click events with rate limiting"""
-    from flask import session
-    import uuid
+def _accept_click():
+    """Rate limit a click and take the next count; returns None if rejected"""
+    global _stats_ver
     
     # Get or create client ID
     if 'client_id' not in session:
-        session['client_id'] = str(uuid.uuid4())
+        session['client_id'] = secrets.token_urlsafe(12)
     client_id = session['client_id']
     
     # Rate limiting check
@@ -227,44 +428,73 @@ def handle_button_click(data=None):
             'message': 'Clicking too fast! Please slow down.',
             'remaining': rate_limiter.get_remaining_requests(client_id)
         })
-        return
+        return None
     
     # Update the count
-    button_state['count'] = button_state.get('count', 0) + 1
+    new_count = next(click_counter)
+    button_state['count'] = new_count
+    _stats_ver += 1  # /api/stats reports the count as well
+    logger.debug(f"Button clicked by {client_id}. New count: {new_count}")
+    return new_count
+
+def _publish_click(new_count: int, session_client_id: Optional[str]):
+    """Log an accepted click and queue the broadcast of the new state"""
+    global _pending_broadcast
+    
+    # Log the click; snapshots are rewritten by the background task
+    data_manager.append_click({"t": time.time(), "c": new_count, "u": session_client_id})
+    button_state_dirty.set()
+    _recent_clicks.append(time.monotonic())
+    
+    # Queue a broadcast of the new state; send right away on milestones or
+    # when the line has been quiet for a full interval
+    _pending_broadcast = True
+    if (new_count % 100 == 0 or
+            time.monotonic() - _last_broadcast_ts >= app_config.BROADCAST_INTERVAL):
+        flush_broadcast()
+
+def _click_handler_stats_on(data=None):
+    """Handle button click events with rate limiting and per-user stats"""
+    new_count = _accept_click()
+    if new_count is None:
+        return
     
     # Get session client_id from data if provided
     session_client_id = None
     if data and isinstance(data, dict):
         session_client_id = data.get('client_id')
     
-    # Update user stats if enabled and we have a session client_id
-    if app_config.ENABLE_STATS and session_client_id and session_client_id in stats_data.get("user_sessions", {}):
-        user_session = stats_data["user_sessions"][session_client_id]
-        user_session["clicks"] = user_session.get("clicks", 0) + 1
+    # Update user stats if we have a known session client_id
+    user_session = user_sessions.get(session_client_id) if session_client_id else None
+    if user_session is not None:
+        user_sessions.move_to_end(session_client_id)
+        user_session["clicks"] += 1
         user_session["last_click"] = time.time()
         
-        # Update daily stats
-        stats_data["clicks_today"] = stats_data.get("clicks_today", 0) + 1
-        current_hour = datetime.now().hour
-        if "clicks_per_hour" not in stats_data:
-            stats_data["clicks_per_hour"] = [0] * 24
-        if current_hour < len(stats_data["clicks_per_hour"]):
-            stats_data["clicks_per_hour"][current_hour] += 1
-        
-        data_manager.save_stats(stats_data)
-    
-    # Save button state to file for persistence
-    success = data_manager.save_button_state(button_state)
-    if not success:
-        logger.error("Failed to save button state")
+        # Update daily stats, starting a new day first if midnight has passed
+        if time.time() >= _next_day_ts:
+            roll_daily_stats()
+        stats_data["clicks_today"] += 1
+        stats_data["clicks_per_hour"][current_hour()] += 1
+    else:
+        session_client_id = None
     
-    # Broadcast the new state to all connected clients
-    emit('update_state', button_state, broadcast=True)
-    logger.debug(f"Button clicked by {client_id}. New count: {button_state.get('count', 0)}")
+    _publish_click(new_count, session_client_id)
+
+def _click_handler_stats_off(data=None):
+    """Handle button click events with rate limiting"""
+    new_count = _accept_click()
+    if new_count is not None:
+        _publish_click(new_count, None)
+
+# Pick the click handler once instead of testing the stats flag per click
+handle_button_click = _click_handler_stats_on if app_config.ENABLE_STATS else _click_handler_stats_off
+socketio.on_event('button_click', handle_button_click)
 
 @socketio.on('achievement_unlocked')
 def handle_achievement_unlock(data):
     """Handle achievement unlock events"""
+    global _ach_ver
     if not app_config.ENABLE_ACHIEVEMENTS:
         return
         
@@ -280,25 +510,25 @@ def handle_achievement_unlock(data):
         achievements_data["player_achievements"] = {}
         
     if user_id not in achievements_data["player_achievements"]:
-        achievements_data["player_achievements"][user_id] = []
+        achievements_data["player_achievements"][user_id] = set()
     
-    if achievement_id not in achievements_data["player_achievements"][user_id]:
-        achievements_data["player_achievements"][user_id].append(achievement_id)
+    achievements_data["player_achievements"][user_id].add(achievement_id)
     
     # Add to global achievements if not already there
     if "global_unlocked" not in achievements_data:
-        achievements_data["global_unlocked"] = []
+        achievements_data["global_unlocked"] = set()
         
     if achievement_id not in achievements_data["global_unlocked"]:
-        achievements_data["global_unlocked"].append(achievement_id)
+        achievements_data["global_unlocked"].add(achievement_id)
+        # Deliver the count that earned it before the achievement itself
+        flush_broadcast()
         # Broadcast new achievement to all clients
         emit('new_global_achievement', {'id': achievement_id}, broadcast=True)
     
-    success = data_manager.save_achievements(achievements_data)
-    if success:
-        logger.info(f"Achievement {achievement_id} unlocked by user {user_id}")
-    else:
-        logger.error(f"Failed to save achievement unlock: {achievement_id}")
+    _ach_ver += 1
+    # Written in the background; unlock bursts share a single write
+    data_manager.save_achievements(achievements_data, wait=False)
+    logger.info(f"Achievement {achievement_id} unlocked by user {user_id}")
 
 def get_local_ip():
     """Get the local IP address for network access"""
@@ -329,7 +559,7 @@ def print_startup_info():
     print(f"=============================================\n")
     
     # Print app state information
-    print(f"Current click count: {button_state.get('count', 0)}")
+    print(f"Current click count: {button_state['count']}")
     print(f"Last updated: {datetime.fromtimestamp(button_state.get('last_updated', 0)).strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Unique users recorded: {stats_data.get('unique_users', 0)}")
     print(f"Global achievements unlocked: {len(achievements_data.get('global_unlocked', []))}")
@@ -20,11 +20,18 @@ class Config:
     CLICK_DATA_FILE = os.path.join(DATA_DIR, "button_clicks.json")
     ACHIEVEMENTS_FILE = os.path.join(DATA_DIR, "achievements.json")
     STATS_FILE = os.path.join(DATA_DIR, "stats.json")
+    CLICK_LOG_FILE = os.path.join(DATA_DIR, "clicks.log")
     BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+    DURABLE_WRITES = os.environ.get('DURABLE_WRITES', 'False').lower() in ['true', '1', 'yes']  # fsync saves and their directory; blocks the eventlet hub
     
     # Performance Settings
     MAX_CONNECTIONS = int(os.environ.get('MAX_CONNECTIONS', 1000))
-    RATE_LIMIT_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PER_MINUTE', 600))  # 10 clicks per second max
+    RATE_LIMIT_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PER_MINUTE', 600))  # Sustained 10 clicks/s; a rested client may burst one more minute's worth
+    FLUSH_INTERVAL = float(os.environ.get('FLUSH_INTERVAL_SECONDS', 0.5))  # Batch disk writes of click data
+    STATS_FLUSH_INTERVAL = float(os.environ.get('STATS_FLUSH_INTERVAL_SECONDS', 5))  # Write-behind for non-click stats changes
+    COMPACTION_INTERVAL = int(os.environ.get('COMPACTION_INTERVAL_SECONDS', 60))  # Fold click log into snapshots
+    BROADCAST_INTERVAL = float(os.environ.get('BROADCAST_INTERVAL_SECONDS', 0.05))  # Coalesce update_state broadcasts
+    MAX_TRACKED_SESSIONS = int(os.environ.get('MAX_TRACKED_SESSIONS', 10000))  # In-memory user session LRU size
     SESSION_TIMEOUT = timedelta(hours=int(os.environ.get('SESSION_TIMEOUT_HOURS', 24)))
     
     # Feature Flags
@@ -35,11 +42,15 @@ class Config:
     # Backup Settings
     BACKUP_INTERVAL_HOURS = int(os.environ.get('BACKUP_INTERVAL_HOURS', 24))
     MAX_BACKUPS = int(os.environ.get('MAX_BACKUPS', 7))
+    PRETTY_JSON = os.environ.get('PRETTY_JSON', 'True').lower() in ['true', '1', 'yes']  # Indent backup files
     
     # Logging Settings
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.path.join(DATA_DIR, 'app.log')
     
+    # Let a fronting nginx/Apache send static files via X-Sendfile
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False').lower() in ['true', '1', 'yes']
+    
     # CORS Settings
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
     
@@ -60,7 +71,7 @@ class ProductionConfig(Config):
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-must-set-a-secret-key-in-production'
     
     # More restrictive settings for production
-    RATE_LIMIT_PER_MINUTE = 300  # 5 clicks per second max
+    RATE_LIMIT_PER_MINUTE = 300  # Sustained 5 clicks per second
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5000')
 
 class TestingConfig(Config):
@@ -70,6 +81,7 @@ class TestingConfig(Config):
     CLICK_DATA_FILE = "test_button_clicks.json"
     ACHIEVEMENTS_FILE = "test_achievements.json"
     STATS_FILE = "test_stats.json"
+    CLICK_LOG_FILE = "test_clicks.log"
 
 # Configuration mapping
 config = {
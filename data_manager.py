@@ -1,246 +1,576 @@
 """
 Data management utilities for the Interactive Button Application
 """
-import json
 import os
 import time
+import atexit
 import logging
+import hashlib
+import heapq
 import shutil
-from datetime import datetime
+import threading
+from array import array
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-from threading import Lock
+from threading import Lock, RLock
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Rename-over is atomic on both POSIX and Windows
+_atomic_replace = os.replace
+
+if os.name == 'posix':
+    def _fsync_dir(path: str):
+        """Persist a rename by fsyncing the directory that holds it"""
+        dir_fd = os.open(path or '.', os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+else:
+    def _fsync_dir(path: str):
+        """Directories can't be fsynced here; the rename is as durable as it gets"""
+
+def _copy_file(src: str, dst: str):
+    """
+    Copy src to dst with metadata, letting the kernel clone or copy the data
+    via copy_file_range where available, and falling back to shutil.copy2
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                shutil.copystat(src, dst)
+                return
+        except FileNotFoundError:
+            raise
+        except OSError:
+            pass  # Unsupported filesystem or kernel; copy in user space instead
+    shutil.copy2(src, dst)
+
+class _PendingWriter:
+    """
+    Group-commit writer for one data file: saves submitted within a short
+    window are coalesced, and only the latest snapshot is encoded and written.
+    The window is skipped while a caller is waiting, so a lone waited save
+    costs one write rather than the window plus a write.
+    """
+    
+    def __init__(self, write_func, window: float = 0.02, max_batch: int = 100):
+        self._write_func = write_func
+        self._window = window
+        self._max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = None
+        self._submitted = 0  # Generation of the latest submitted snapshot
+        self._written = 0  # Generation covered by the last finished write
+        self._last_result = True
+        self._waiters = 0  # Callers blocked in submit(wait=True) or flush()
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def submit(self, data: Any, wait: bool = True) -> bool:
+        """
+        Queue data as the file's next contents, replacing any pending snapshot
+        
+        Args:
+            data: Snapshot to write
+            wait: Block until a write covering this snapshot has finished
+            
+        Returns:
+            Result of that write when waiting, otherwise True
+        """
+        with self._cond:
+            self._pending = data
+            self._submitted += 1
+            generation = self._submitted
+            self._cond.notify_all()
+            if not wait:
+                return True
+            return self._wait_for(generation)
+    
+    def flush(self) -> bool:
+        """Block until everything submitted so far has been written"""
+        with self._cond:
+            return self._wait_for(self._submitted)
+    
+    def _wait_for(self, generation: int) -> bool:
+        """Wait, holding the condition, until generation has been written"""
+        if self._written >= generation:
+            return self._last_result
+        self._waiters += 1
+        self._cond.notify_all()  # Cut short a window already in progress
+        try:
+            while self._written < generation:
+                self._cond.wait()
+        finally:
+            self._waiters -= 1
+        return self._last_result
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                
+                # Let a burst of saves pile up behind the first one
+                deadline = time.monotonic() + self._window
+                while (self._submitted - self._written < self._max_batch
+                       and not self._waiters):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                data, generation = self._pending, self._submitted
+                self._pending = None
+            
+            try:
+                result = self._write_func(data)
+            except Exception as e:
+                logger.error(f"Unexpected error in pending writer: {e}")
+                result = False
+            
+            with self._cond:
+                self._written = generation
+                self._last_result = result
+                self._cond.notify_all()
+
 class DataManager:
     """Handles all data persistence operations with thread safety and error handling"""
     
     def __init__(self, config):
         self.config = config
         self._file_locks = {
-            'clicks': Lock(),
-            'achievements': Lock(),
-            'stats': Lock()
+            'log': Lock(),
+            'compact': Lock()  # Serializes compactions; taken before 'log'
         }
         
+        # Latest in-memory snapshot per data file; the locks are only held to
+        # swap references, never across disk I/O
+        self._snapshots = {'clicks': None, 'achievements': None, 'stats': None}
+        self._snapshot_locks = {name: RLock() for name in self._snapshots}
+        
+        # Daily stats key, reformatted only once the local date changes
+        self._today_str = None
+        self._next_day_ts = 0.0
+        
+        # Digest of the data files at the last backup, and where it was written
+        self._last_backup_hash = None
+        self._last_backup_path = None
+        
         # Ensure data directories exist
         config.ensure_directories()
+        
+        # Append-only click log, compacted into the snapshot files periodically
+        self._log_fh = open(config.CLICK_LOG_FILE, 'ab', buffering=64 * 1024)
+        
+        # Background writers that coalesce bursts of saves per file
+        self._writers = {
+            'clicks': _PendingWriter(
+                lambda state: self._write_file("button state", config.CLICK_DATA_FILE, state)),
+            'achievements': _PendingWriter(
+                lambda data: self._write_file("achievements", config.ACHIEVEMENTS_FILE, data)),
+            'stats': _PendingWriter(
+                lambda data: self._write_file("stats", config.STATS_FILE, data))
+        }
+        atexit.register(self.flush_pending_writes)
     
-    def _safe_file_operation(self, operation_name: str, file_path: str, operation_func, default_data: Any = None):
+    def _handle_load_error(self, operation_name: str, file_path: str, error: Exception):
         """
-        Safely perform file operations with proper error handling and logging
+        Log a failed load and back up the file if it is corrupted; called only
+        on the error path, so successful loads pay nothing for it. Permission
+        errors are re-raised, every other failure falls back to default data.
         """
-        try:
-            return operation_func()
-        except FileNotFoundError:
+        if isinstance(error, FileNotFoundError):
             logger.info(f"{operation_name}: File {file_path} not found, using default data")
-            return default_data
-        except json.JSONDecodeError as e:
-            logger.error(f"{operation_name}: JSON decode error in {file_path}: {e}")
+        elif isinstance(error, orjson.JSONDecodeError):
+            logger.error(f"{operation_name}: JSON decode error in {file_path}: {error}")
             # Create backup of corrupted file
             self._backup_corrupted_file(file_path)
-            return default_data
-        except PermissionError as e:
-            logger.error(f"{operation_name}: Permission error accessing {file_path}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"{operation_name}: Unexpected error with {file_path}: {e}")
-            return default_data
+        elif isinstance(error, PermissionError):
+            logger.error(f"{operation_name}: Permission error accessing {file_path}: {error}")
+            raise error
+        else:
+            logger.error(f"{operation_name}: Unexpected error with {file_path}: {error}")
     
     def _backup_corrupted_file(self, file_path: str):
         """Create a backup of corrupted file for debugging"""
-        if os.path.exists(file_path):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"{file_path}.corrupted.{timestamp}"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_path = f"{file_path}.corrupted.{timestamp}"
+        try:
+            _copy_file(file_path, backup_path)
+            logger.info(f"Corrupted file backed up to: {backup_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to backup corrupted file: {e}")
+    
+    @staticmethod
+    def _write_all(f, payload: bytes):
+        """Write payload to an unbuffered binary file, normally in one write() call"""
+        view = memoryview(payload)
+        while view:
+            view = view[f.write(view):]
+    
+    def _atomic_write(self, file_path: str, payload: bytes):
+        """
+        Replace file_path with payload: write a temp file, then rename it over
+        the target so readers never see a partial file. With DURABLE_WRITES the
+        file and its directory are fsynced so the rename survives a crash.
+        """
+        temp_file = file_path + '.tmp'
+        durable = self.config.DURABLE_WRITES
+        try:
+            with open(temp_file, 'wb', buffering=0) as f:
+                self._write_all(f, payload)
+                if durable:
+                    os.fsync(f.fileno())
+            _atomic_replace(temp_file, file_path)
+            if durable:
+                _fsync_dir(os.path.dirname(file_path))
+        except Exception:
+            # Clean up temp file if one was left behind
             try:
-                shutil.copy2(file_path, backup_path)
-                logger.info(f"Corrupted file backed up to: {backup_path}")
-            except Exception as e:
-                logger.error(f"Failed to backup corrupted file: {e}")
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+    
+    def _write_file(self, label: str, file_path: str, data: Dict[str, Any]) -> bool:
+        """Encode and atomically write one data file; used by the pending writers"""
+        try:
+            self._atomic_write(file_path, orjson.dumps(data, default=list))
+            logger.debug(f"{label.capitalize()} saved")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {label}: {e}")
+            return False
+    
+    def flush_pending_writes(self) -> bool:
+        """Wait for all queued saves to reach the disk"""
+        success = True
+        for writer in self._writers.values():
+            success &= writer.flush()
+        return success
+    
+    def _get_snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the latest snapshot for a data file, if one is held"""
+        with self._snapshot_locks[name]:
+            return self._snapshots[name]
+    
+    def _set_snapshot(self, name: str, data: Dict[str, Any], replace: bool = True) -> Dict[str, Any]:
+        """Record data as the latest snapshot and return the snapshot now held"""
+        with self._snapshot_locks[name]:
+            if replace or self._snapshots[name] is None:
+                self._snapshots[name] = data
+            return self._snapshots[name]
     
     def load_button_state(self) -> Dict[str, Any]:
         """Load button state from file with thread safety"""
-        with self._file_locks['clicks']:
-            def load_operation():
-                with open(self.config.CLICK_DATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Validate data structure
-                    if not isinstance(data, dict) or 'count' not in data:
-                        raise ValueError("Invalid button state structure")
-                    return data
-            
-            default_state = {
+        cached = self._get_snapshot('clicks')
+        if cached is not None:
+            return cached
+        
+        try:
+            with open(self.config.CLICK_DATA_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+            # Validate data structure
+            if not isinstance(data, dict) or 'count' not in data:
+                raise ValueError("Invalid button state structure")
+        except Exception as e:
+            self._handle_load_error("Load button state", self.config.CLICK_DATA_FILE, e)
+            data = {
                 "count": 0,
                 "last_updated": time.time(),
                 "version": "2.0"
             }
-            
-            return self._safe_file_operation(
-                "Load button state",
-                self.config.CLICK_DATA_FILE,
-                load_operation,
-                default_state
-            )
-    
-    def save_button_state(self, state: Dict[str, Any]) -> bool:
-        """Save button state to file with thread safety and atomic writes"""
-        with self._file_locks['clicks']:
-            try:
-                # Update timestamp and version
-                state["last_updated"] = time.time()
-                state["version"] = "2.0"
-                
-                # Atomic write: write to temp file first, then rename
-                temp_file = self.config.CLICK_DATA_FILE + '.tmp'
-                with open(temp_file, 'w') as f:
-                    json.dump(state, f, indent=2)
-                
-                # Atomic rename
-                if os.name == 'nt':  # Windows
-                    if os.path.exists(self.config.CLICK_DATA_FILE):
-                        os.remove(self.config.CLICK_DATA_FILE)
-                    os.rename(temp_file, self.config.CLICK_DATA_FILE)
-                else:  # Unix-like systems
-                    os.rename(temp_file, self.config.CLICK_DATA_FILE)
-                
-                logger.debug(f"Button state saved: count={state.get('count', 0)}")
-                return True
-                
-            except Exception as e:
-                logger.error(f"Error saving button state: {e}")
-                # Clean up temp file if it exists
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
-                return False
+        return self._set_snapshot('clicks', data, replace=False)
+    
+    def save_button_state(self, state: Dict[str, Any], wait: bool = True) -> bool:
+        """
+        Save button state to file with thread safety and atomic writes
+        
+        Saves arriving together are coalesced into one write; pass wait=False
+        to return without waiting for it.
+        """
+        with self._snapshot_locks['clicks']:
+            # Update timestamp and version
+            state["last_updated"] = time.time()
+            state["version"] = "2.0"
+            self._snapshots['clicks'] = state
+        return self._writers['clicks'].submit(state, wait)
+    
+    @staticmethod
+    def _normalize_achievements(data: Dict[str, Any]):
+        """Convert decoded achievements to their in-memory form"""
+        # Sets for O(1) membership tests; serialized back as lists
+        data["global_unlocked"] = set(data.get("global_unlocked", []))
+        data["player_achievements"] = {
+            user_id: set(unlocked)
+            for user_id, unlocked in data.get("player_achievements", {}).items()
+        }
+    
+    @staticmethod
+    def _normalize_stats(data: Dict[str, Any]):
+        """Convert decoded stats to their in-memory form"""
+        # User sessions are tracked in memory only
+        data.pop("user_sessions", None)
+        # Hourly counters are updated in place as unboxed integers
+        data["clicks_per_hour"] = array('Q', data.get("clicks_per_hour", [0] * 24))
     
     def load_achievements(self) -> Dict[str, Any]:
         """Load achievements data from file"""
-        with self._file_locks['achievements']:
-            def load_operation():
-                with open(self.config.ACHIEVEMENTS_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Validate structure
-                    if not isinstance(data, dict):
-                        raise ValueError("Invalid achievements structure")
-                    return data
-            
-            default_achievements = {
-                "global_unlocked": [],
+        cached = self._get_snapshot('achievements')
+        if cached is not None:
+            return cached
+        
+        try:
+            with open(self.config.ACHIEVEMENTS_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+            # Validate structure
+            if not isinstance(data, dict):
+                raise ValueError("Invalid achievements structure")
+            self._normalize_achievements(data)
+        except Exception as e:
+            self._handle_load_error("Load achievements", self.config.ACHIEVEMENTS_FILE, e)
+            data = {
+                "global_unlocked": set(),
                 "player_achievements": {},
                 "version": "2.0"
             }
-            
-            return self._safe_file_operation(
-                "Load achievements",
-                self.config.ACHIEVEMENTS_FILE,
-                load_operation,
-                default_achievements
-            )
-    
-    def save_achievements(self, achievements_data: Dict[str, Any]) -> bool:
-        """Save achievements data to file"""
-        with self._file_locks['achievements']:
-            try:
-                achievements_data["version"] = "2.0"
-                achievements_data["last_updated"] = time.time()
-                
-                temp_file = self.config.ACHIEVEMENTS_FILE + '.tmp'
-                with open(temp_file, 'w') as f:
-                    json.dump(achievements_data, f, indent=2)
-                
-                if os.name == 'nt':
-                    if os.path.exists(self.config.ACHIEVEMENTS_FILE):
-                        os.remove(self.config.ACHIEVEMENTS_FILE)
-                    os.rename(temp_file, self.config.ACHIEVEMENTS_FILE)
-                else:
-                    os.rename(temp_file, self.config.ACHIEVEMENTS_FILE)
-                
-                logger.debug("Achievements data saved")
-                return True
-                
-            except Exception as e:
-                logger.error(f"Error saving achievements: {e}")
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
-                return False
+        return self._set_snapshot('achievements', data, replace=False)
+    
+    def save_achievements(self, achievements_data: Dict[str, Any], wait: bool = True) -> bool:
+        """Save achievements data to file; coalesced like save_button_state"""
+        with self._snapshot_locks['achievements']:
+            achievements_data["version"] = "2.0"
+            achievements_data["last_updated"] = time.time()
+            self._snapshots['achievements'] = achievements_data
+        return self._writers['achievements'].submit(achievements_data, wait)
+    
+    def _today(self) -> str:
+        """Return today's local date as YYYY-MM-DD, cached until the next local midnight"""
+        now = time.time()
+        if now >= self._next_day_ts:
+            today = datetime.fromtimestamp(now)
+            self._today_str = today.strftime("%Y-%m-%d")
+            midnight = today.replace(hour=0, minute=0, second=0, microsecond=0)
+            self._next_day_ts = (midnight + timedelta(days=1)).timestamp()
+        return self._today_str
     
     def load_stats(self) -> Dict[str, Any]:
         """Load stats data from file"""
-        with self._file_locks['stats']:
-            def load_operation():
-                with open(self.config.STATS_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Validate structure
-                    if not isinstance(data, dict):
-                        raise ValueError("Invalid stats structure")
-                    return data
-            
-            default_stats = {
+        cached = self._get_snapshot('stats')
+        if cached is not None:
+            return cached
+        
+        try:
+            with open(self.config.STATS_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+            # Validate structure
+            if not isinstance(data, dict):
+                raise ValueError("Invalid stats structure")
+            self._normalize_stats(data)
+        except Exception as e:
+            self._handle_load_error("Load stats", self.config.STATS_FILE, e)
+            data = {
                 "clicks_today": 0,
-                "date": datetime.now().strftime("%Y-%m-%d"),
-                "clicks_per_hour": [0] * 24,
+                "date": self._today(),
+                "clicks_per_hour": array('Q', [0] * 24),
                 "unique_users": 0,
-                "user_sessions": {},
                 "version": "2.0"
             }
-            
-            return self._safe_file_operation(
-                "Load stats",
-                self.config.STATS_FILE,
-                load_operation,
-                default_stats
-            )
-    
-    def save_stats(self, stats_data: Dict[str, Any]) -> bool:
-        """Save stats data to file"""
-        with self._file_locks['stats']:
+        return self._set_snapshot('stats', data, replace=False)
+    
+    @property
+    def next_day_ts(self) -> float:
+        """Timestamp of the next local midnight, as of the latest date check"""
+        return self._next_day_ts
+    
+    def roll_daily_stats(self, stats_data: Dict[str, Any]) -> bool:
+        """Reset daily stats if it's a new day; returns True if they were reset"""
+        today = self._today()
+        if stats_data.get("date") == today:
+            return False
+        stats_data["clicks_today"] = 0
+        stats_data["date"] = today
+        stats_data["clicks_per_hour"] = array('Q', [0] * 24)
+        logger.info("Daily stats reset for new day")
+        return True
+    
+    def save_stats(self, stats_data: Dict[str, Any], wait: bool = True) -> bool:
+        """Save stats data to file; coalesced like save_button_state"""
+        with self._snapshot_locks['stats']:
+            self.roll_daily_stats(stats_data)
+            stats_data["version"] = "2.0"
+            stats_data["last_updated"] = time.time()
+            self._snapshots['stats'] = stats_data
+        return self._writers['stats'].submit(stats_data, wait)
+    
+    def append_click(self, event: Dict[str, Any]):
+        """Append a click event to the buffered click log"""
+        # Encode straight into a newline-terminated line; the file's own
+        # buffer batches the lines, so no extra copy is made per click
+        line = orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE)
+        with self._file_locks['log']:
+            self._log_fh.write(line)
+    
+    def flush_click_log(self) -> bool:
+        """Push buffered click events to the log file"""
+        with self._file_locks['log']:
             try:
-                # Check if it's a new day and reset daily stats if needed
-                today = datetime.now().strftime("%Y-%m-%d")
-                if stats_data.get("date") != today:
-                    stats_data["clicks_today"] = 0
-                    stats_data["date"] = today
-                    stats_data["clicks_per_hour"] = [0] * 24
-                    logger.info("Daily stats reset for new day")
-                
-                stats_data["version"] = "2.0"
-                stats_data["last_updated"] = time.time()
-                
-                temp_file = self.config.STATS_FILE + '.tmp'
-                with open(temp_file, 'w') as f:
-                    json.dump(stats_data, f, indent=2)
-                
-                if os.name == 'nt':
-                    if os.path.exists(self.config.STATS_FILE):
-                        os.remove(self.config.STATS_FILE)
-                    os.rename(temp_file, self.config.STATS_FILE)
-                else:
-                    os.rename(temp_file, self.config.STATS_FILE)
-                
-                logger.debug("Stats data saved")
+                self._log_fh.flush()
                 return True
-                
             except Exception as e:
-                logger.error(f"Error saving stats: {e}")
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
+                logger.error(f"Error flushing click log: {e}")
                 return False
     
+    def compact_click_log(self, state: Dict[str, Any], stats_data: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Rewrite the snapshot files from memory and drop the logged clicks they
+        now hold. The log lock is only held to take the snapshots and to trim
+        the log, never while the writes run, so clicks keep flowing meanwhile.
+        """
+        with self._file_locks['compact']:
+            with self._file_locks['log']:
+                try:
+                    offset = self._log_size()
+                except Exception as e:
+                    logger.error(f"Error flushing click log: {e}")
+                    return False
+                
+                # Save copies: clicks logged past offset must not leak into
+                # these snapshots, or a replay would count them twice
+                frozen_state = dict(state)
+                self.save_button_state(frozen_state, wait=False)
+                # Keep the live state's timestamp in step with what was saved
+                state["last_updated"] = frozen_state["last_updated"]
+                if stats_data is not None:
+                    self.roll_daily_stats(stats_data)
+                    frozen_stats = dict(stats_data)
+                    frozen_stats["clicks_per_hour"] = array('Q', stats_data["clicks_per_hour"])
+                    self.save_stats(frozen_stats, wait=False)
+                    stats_data["last_updated"] = frozen_stats["last_updated"]
+            
+            success = self._writers['clicks'].flush()
+            if stats_data is not None:
+                success &= self._writers['stats'].flush()
+            
+            # Only drop logged events once the snapshots hold them
+            if not success:
+                return False
+            with self._file_locks['log']:
+                try:
+                    self._drop_log_prefix(offset)
+                    logger.debug("Click log compacted")
+                    return True
+                except Exception as e:
+                    logger.error(f"Error truncating click log: {e}")
+                    return False
+    
+    def _log_size(self) -> int:
+        """Flush the click log and return its size on disk; caller holds the log lock"""
+        # Not tell(): an append-mode handle keeps its old position after truncate()
+        self._log_fh.flush()
+        return os.fstat(self._log_fh.fileno()).st_size
+    
+    def _truncate_log(self):
+        """Empty the click log; caller holds the log lock"""
+        self._log_fh.flush()
+        self._log_fh.truncate(0)
+        self._log_fh.seek(0)
+    
+    def _drop_log_prefix(self, offset: int):
+        """Remove the first offset bytes of the click log; caller holds the log lock"""
+        if self._log_size() == offset:
+            # Nothing was logged while the snapshots were written
+            self._truncate_log()
+            return
+        
+        # Keep the clicks logged since, swapping the trimmed log in atomically
+        with open(self.config.CLICK_LOG_FILE, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        self._log_fh.close()
+        try:
+            self._atomic_write(self.config.CLICK_LOG_FILE, tail)
+        finally:
+            self._log_fh = open(self.config.CLICK_LOG_FILE, 'ab', buffering=64 * 1024)
+    
+    def replay_click_log(self, state: Dict[str, Any], stats_data: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Apply click events logged after the last compaction to loaded snapshots
+        
+        Returns:
+            Number of events replayed
+        """
+        with self._file_locks['log']:
+            try:
+                with open(self.config.CLICK_LOG_FILE, 'rb') as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                return 0
+        
+        replayed = 0
+        for line in lines:
+            try:
+                event = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                logger.warning("Click log ends with a partial event, ignoring the rest")
+                break
+            
+            # Events already covered by the snapshot
+            if event["c"] <= state.get("count", 0):
+                continue
+            state["count"] = event["c"]
+            replayed += 1
+            
+            # "u" is only logged for clicks that were counted in the stats
+            if stats_data is not None and event.get("u"):
+                local = time.localtime(event["t"])
+                if time.strftime("%Y-%m-%d", local) == stats_data.get("date"):
+                    stats_data["clicks_today"] = stats_data.get("clicks_today", 0) + 1
+                    stats_data["clicks_per_hour"][local.tm_hour] += 1
+        
+        if replayed:
+            logger.info(f"Replayed {replayed} click events from {self.config.CLICK_LOG_FILE}")
+        return replayed
+    
+    def _data_files_digest(self) -> bytes:
+        """Hash the raw bytes of the data files as they are on disk"""
+        digest = hashlib.blake2b(digest_size=16)
+        for file_path in (self.config.CLICK_DATA_FILE, self.config.ACHIEVEMENTS_FILE,
+                          self.config.STATS_FILE):
+            try:
+                with open(file_path, 'rb') as f:
+                    digest.update(f.read())
+            except FileNotFoundError:
+                pass
+            digest.update(b"\0")  # Keep file boundaries distinct
+        return digest.digest()
+    
     def create_backup(self) -> Optional[str]:
         """Create a backup of all data files"""
         if not self.config.ENABLE_BACKUPS:
             return None
             
         try:
+            # Every save rewrites its file, so unchanged files mean nothing to back up
+            self.flush_pending_writes()
+            files_hash = self._data_files_digest()
+            if (files_hash == self._last_backup_hash
+                    and os.path.exists(self._last_backup_path)):
+                logger.debug(f"Data unchanged since {self._last_backup_path}, skipping backup")
+                return self._last_backup_path
+            
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_filename = f"backup_{timestamp}.json"
             backup_path = os.path.join(self.config.BACKUP_DIR, backup_filename)
@@ -254,10 +584,15 @@ class DataManager:
                 "version": "2.0"
             }
             
-            with open(backup_path, 'w') as f:
-                json.dump(backup_data, f, indent=2)
+            # Encode in one go so the file gets a single write instead of one per token
+            option = orjson.OPT_INDENT_2 if self.config.PRETTY_JSON else 0
+            payload = orjson.dumps(backup_data, option=option, default=list)
+            with open(backup_path, 'wb', buffering=0) as f:
+                self._write_all(f, payload)
             
             logger.info(f"Backup created: {backup_path}")
+            self._last_backup_hash = files_hash
+            self._last_backup_path = backup_path
             
             # Clean up old backups
             self._cleanup_old_backups()
@@ -271,18 +606,19 @@ class DataManager:
     def _cleanup_old_backups(self):
         """Remove old backup files to maintain max backup count"""
         try:
-            backup_files = []
-            for filename in os.listdir(self.config.BACKUP_DIR):
-                if filename.startswith("backup_") and filename.endswith(".json"):
-                    filepath = os.path.join(self.config.BACKUP_DIR, filename)
-                    backup_files.append((filepath, os.path.getmtime(filepath)))
+            # One pass over the directory; DirEntry.stat() still stats each file on
+            # POSIX (Windows fills it from the listing), but needs no path join
+            with os.scandir(self.config.BACKUP_DIR) as entries:
+                backup_files = [
+                    (entry.path, entry.stat().st_mtime)
+                    for entry in entries
+                    if entry.name.startswith("backup_") and entry.name.endswith(".json")
+                ]
             
-            # Sort by modification time (newest first)
-            backup_files.sort(key=lambda x: x[1], reverse=True)
-            
-            # Remove excess backups
-            if len(backup_files) > self.config.MAX_BACKUPS:
-                for filepath, _ in backup_files[self.config.MAX_BACKUPS:]:
+            # Remove excess backups, oldest first, without sorting the rest
+            excess = len(backup_files) - self.config.MAX_BACKUPS
+            if excess > 0:
+                for filepath, _ in heapq.nsmallest(excess, backup_files, key=lambda x: x[1]):
                     os.remove(filepath)
                     logger.info(f"Old backup removed: {filepath}")
                     
@@ -292,20 +628,29 @@ class DataManager:
     def restore_from_backup(self, backup_path: str) -> bool:
         """Restore data from a backup file"""
         try:
-            with open(backup_path, 'r') as f:
-                backup_data = json.load(f)
+            with open(backup_path, 'rb') as f:
+                backup_data = orjson.loads(f.read())
             
             # Validate backup structure
             required_keys = ["button_state", "achievements", "stats"]
             if not all(key in backup_data for key in required_keys):
                 raise ValueError("Invalid backup file structure")
             
+            # Saves replace the cached snapshots, so give them the loaded form
+            self._normalize_achievements(backup_data["achievements"])
+            self._normalize_stats(backup_data["stats"])
+            
             # Restore each data file
             success = True
             success &= self.save_button_state(backup_data["button_state"])
             success &= self.save_achievements(backup_data["achievements"])
             success &= self.save_stats(backup_data["stats"])
             
+            # Logged clicks belong to the data being replaced
+            if success:
+                with self._file_locks['log']:
+                    self._truncate_log()
+            
             if success:
                 logger.info(f"Successfully restored from backup: {backup_path}")
             else:
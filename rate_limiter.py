@@ -3,20 +3,38 @@ Rate limiting utilities for the Interactive Button Application
 """
 import time
 import logging
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict
 from threading import Lock
-from typing import Dict, Deque
 
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    """Rate limiting class to prevent spam clicking and abuse"""
+    """
+    Token-bucket rate limiter to prevent spam clicking and abuse
     
-    def __init__(self, max_requests_per_minute: int = 600):
+    max_requests_per_minute is the sustained refill rate. A full bucket holds
+    burst_seconds worth of requests on top of it, so with the default 60 s
+    burst a rested client can make up to twice the per-minute limit in its
+    first minute, unlike a sliding window's hard cap per 60 s.
+    """
+    
+    SHARD_COUNT = 64  # Must be a power of two
+    
+    def __init__(self, max_requests_per_minute: int = 600, burst_seconds: float = 60):
         self.max_requests = max_requests_per_minute
-        self.requests: Dict[str, Deque[float]] = defaultdict(deque)
-        self.lock = Lock()
-        self.warning_counts = defaultdict(int)
+        self.rate = max_requests_per_minute / 60.0  # Tokens refilled per second
+        self.burst_seconds = burst_seconds
+        self.capacity = self.rate * burst_seconds
+        # Clients are spread over independently locked shards so unrelated
+        # clients never wait on each other. Each shard holds
+        # (lock, client_id -> (tokens, last_refill), warning counts), with
+        # buckets kept least recently refilled first.
+        self._shards = [(Lock(), OrderedDict(), defaultdict(int))
+                        for _ in range(self.SHARD_COUNT)]
+    
+    def _shard(self, client_id: str):
+        """Return the (lock, buckets, warning_counts) shard owning client_id"""
+        return self._shards[hash(client_id) & (self.SHARD_COUNT - 1)]
     
     def is_allowed(self, client_id: str) -> bool:
         """
@@ -28,61 +46,63 @@ class RateLimiter:
         Returns:
             True if request is allowed, False if rate limited
         """
-        with self.lock:
-            current_time = time.time()
-            client_requests = self.requests[client_id]
-            
-            # Remove requests older than 1 minute
-            while client_requests and current_time - client_requests[0] > 60:
-                client_requests.popleft()
+        lock, buckets, warning_counts = self._shard(client_id)
+        with lock:
+            now = time.monotonic()
+            # Refill inline; this is the per-click hot path
+            bucket = buckets.get(client_id)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
             
-            # Check if under rate limit
-            if len(client_requests) < self.max_requests:
-                client_requests.append(current_time)
+            # Spend a token if one is available; the bucket is updated either way
+            allowed = tokens >= 1
+            buckets[client_id] = (tokens - allowed, now)
+            buckets.move_to_end(client_id)
+            if allowed:
                 return True
-            else:
-                # Log rate limiting
-                self.warning_counts[client_id] += 1
-                if self.warning_counts[client_id] % 10 == 1:  # Log every 10th violation
-                    logger.warning(f"Rate limit exceeded for client {client_id} "
-                                 f"({len(client_requests)} requests in last minute)")
-                return False
+            
+            # Log rate limiting
+            warning_counts[client_id] += 1
+            if warning_counts[client_id] % 10 == 1:  # Log every 10th violation
+                logger.warning(f"Rate limit exceeded for client {client_id} "
+                             f"({self.max_requests} requests per minute allowed)")
+            return False
     
     def get_remaining_requests(self, client_id: str) -> int:
-        """Get remaining requests for a client in the current minute"""
-        with self.lock:
-            current_time = time.time()
-            client_requests = self.requests[client_id]
-            
-            # Clean old requests
-            while client_requests and current_time - client_requests[0] > 60:
-                client_requests.popleft()
-            
-            return max(0, self.max_requests - len(client_requests))
+        """Get the number of requests a client can make right now"""
+        lock, buckets, _ = self._shard(client_id)
+        with lock:
+            bucket = buckets.get(client_id)
+            if bucket is None:
+                return int(self.capacity)
+            tokens, last_refill = bucket
+            return int(min(self.capacity,
+                           tokens + (time.monotonic() - last_refill) * self.rate))
     
     def cleanup_old_entries(self):
-        """Clean up old client entries to prevent memory leaks"""
-        with self.lock:
-            current_time = time.time()
-            clients_to_remove = []
-            
-            for client_id, client_requests in self.requests.items():
-                # Remove requests older than 1 minute
-                while client_requests and current_time - client_requests[0] > 60:
-                    client_requests.popleft()
+        """Drop buckets idle long enough to be full again; they are equivalent to new clients"""
+        removed = 0
+        for lock, buckets, warning_counts in self._shards:
+            with lock:
+                now = time.monotonic()
                 
-                # If no recent requests, mark for removal
-                if not client_requests:
-                    clients_to_remove.append(client_id)
-            
-            # Remove empty client entries
-            for client_id in clients_to_remove:
-                del self.requests[client_id]
-                if client_id in self.warning_counts:
-                    del self.warning_counts[client_id]
-            
-            if clients_to_remove:
-                logger.debug(f"Cleaned up {len(clients_to_remove)} inactive client entries")
+                # Buckets are kept in refill order, so idle entries form a prefix
+                cutoff = now - self.burst_seconds
+                stale = 0
+                for _, last_refill in buckets.values():
+                    if last_refill > cutoff:
+                        break
+                    stale += 1
+                
+                for _ in range(stale):
+                    client_id, _ = buckets.popitem(last=False)
+                    warning_counts.pop(client_id, None)
+                removed += stale
+        
+        if removed:
+            logger.debug(f"Cleaned up {removed} inactive client entries")
 
 
 class ConnectionLimiter:
@@ -95,19 +115,25 @@ class ConnectionLimiter:
     
     def can_connect(self, client_id: str) -> bool:
         """Check if a new connection can be accepted"""
-        with self.lock:
-            if len(self.active_connections) >= self.max_connections:
-                logger.warning(f"Connection limit reached ({self.max_connections}). "
-                              f"Rejecting connection from {client_id}")
-                return False
-            return True
+        # Unlocked fast path; add_connection re-checks under the lock
+        if len(self.active_connections) >= self.max_connections:
+            logger.warning(f"Connection limit reached ({self.max_connections}). "
+                          f"Rejecting connection from {client_id}")
+            return False
+        return True
     
-    def add_connection(self, client_id: str):
-        """Add a new connection"""
+    def add_connection(self, client_id: str) -> bool:
+        """Add a new connection, returning False if the limit was reached meanwhile"""
         with self.lock:
-            self.active_connections.add(client_id)
+            if client_id not in self.active_connections:
+                if len(self.active_connections) >= self.max_connections:
+                    logger.warning(f"Connection limit reached ({self.max_connections}). "
+                                  f"Rejecting connection from {client_id}")
+                    return False
+                self.active_connections.add(client_id)
             logger.debug(f"Connection added: {client_id}. "
                         f"Total connections: {len(self.active_connections)}")
+            return True
     
     def remove_connection(self, client_id: str):
         """Remove a connection"""
@@ -119,5 +145,4 @@ class ConnectionLimiter:
     
     def get_connection_count(self) -> int:
         """Get current number of active connections"""
-        with self.lock:
-            return len(self.active_connections)
+        return len(self.active_connections)
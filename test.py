@@ -69,7 +69,8 @@ def test_data_manager():
             print("✗ Failed to save button state")
             return False
             
-        loaded_state = dm.load_button_state()
+        # A fresh manager has no cached snapshot, so this reads the file back
+        loaded_state = DataManager(config['testing']).load_button_state()
         if loaded_state.get("count") == 42:
             print("✓ Data manager save/load working")
         else:
@@ -82,6 +83,170 @@ def test_data_manager():
         print(f"✗ Data manager error: {e}")
         return False
 
+def test_pending_writer():
+    """Test that the group-commit writer coalesces saves and reports failures"""
+    print("Testing pending writer...")
+    
+    try:
+        from data_manager import _PendingWriter
+        
+        written = []
+        outcome = {"ok": True}
+        
+        def write(data):
+            written.append(data)
+            return outcome["ok"]
+        
+        writer = _PendingWriter(write, window=0.05)
+        
+        # A burst of unwaited saves collapses into a write of the latest one
+        for i in range(10):
+            writer.submit(i, wait=False)
+        if not writer.flush() or written[-1] != 9 or len(written) >= 10:
+            print(f"✗ Pending writer did not coalesce: wrote {written}")
+            return False
+        
+        # A lone waited save doesn't sit out the window
+        start = time.monotonic()
+        if not writer.submit(10) or time.monotonic() - start >= 0.05:
+            print("✗ Waited save was delayed by the coalescing window")
+            return False
+        
+        # A failed write is reported to whoever waits on it
+        outcome["ok"] = False
+        if writer.submit(11) or writer.flush():
+            print("✗ Pending writer hid a failed write")
+            return False
+        
+        print("✓ Pending writer working")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Pending writer error: {e}")
+        return False
+
+def test_click_log_replay():
+    """Test that logged clicks are recovered on the next load"""
+    print("Testing click log replay...")
+    
+    try:
+        from config import config
+        from data_manager import DataManager
+        
+        dm = DataManager(config['testing'])
+        state = {"count": 10}
+        if not dm.compact_click_log(state):
+            print("✗ Failed to compact click log")
+            return False
+        
+        # Log clicks without compacting, as if the server stopped abruptly
+        for count in range(11, 16):
+            dm.append_click({"t": time.time(), "c": count, "u": None})
+        dm.flush_click_log()
+        
+        restored = DataManager(config['testing']).load_button_state()
+        replayed = dm.replay_click_log(restored)
+        if replayed == 5 and restored.get("count") == 15:
+            print("✓ Click log replay working")
+        else:
+            print(f"✗ Click log replay failed: replayed {replayed}, count {restored.get('count')}")
+            return False
+            
+        return True
+        
+    except Exception as e:
+        print(f"✗ Click log replay error: {e}")
+        return False
+
+def test_compaction_keeps_new_clicks():
+    """Test that clicks logged while a compaction writes survive it"""
+    print("Testing compaction with concurrent clicks...")
+    
+    try:
+        from config import config
+        from data_manager import DataManager
+        
+        dm = DataManager(config['testing'])
+        state = {"count": 10}
+        for count in range(1, 11):
+            dm.append_click({"t": time.time(), "c": count, "u": None})
+        if not dm.compact_click_log(state):
+            print("✗ Failed to compact click log")
+            return False
+        
+        # Compact again with nothing logged in between, and log more clicks
+        # while that compaction's snapshot is being written
+        write_snapshot = dm._writers['clicks']._write_func
+        
+        def write_with_clicks(data):
+            for count in range(11, 16):
+                dm.append_click({"t": time.time(), "c": count, "u": None})
+            return write_snapshot(data)
+        
+        dm._writers['clicks']._write_func = write_with_clicks
+        try:
+            compacted = dm.compact_click_log(state)
+        finally:
+            dm._writers['clicks']._write_func = write_snapshot
+        dm.flush_click_log()
+        
+        restored = DataManager(config['testing']).load_button_state()
+        replayed = dm.replay_click_log(restored)
+        if compacted and replayed == 5 and restored.get("count") == 15:
+            print("✓ Clicks logged during compaction kept")
+        else:
+            print(f"✗ Compaction lost clicks: replayed {replayed}, count {restored.get('count')}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Compaction error: {e}")
+        return False
+
+def test_backup_skip():
+    """Test that unchanged data reuses the last backup and a save makes a new one"""
+    print("Testing backup skip...")
+    
+    import shutil
+    import tempfile
+    from config import config
+    from data_manager import DataManager
+    
+    class BackupConfig(config['testing']):
+        BACKUP_DIR = tempfile.mkdtemp()
+        ENABLE_BACKUPS = True
+    
+    try:
+        dm = DataManager(BackupConfig)
+        dm.save_button_state({"count": 1})
+        
+        first = dm.create_backup()
+        second = dm.create_backup()
+        if not first or second != first:
+            print(f"✗ Unchanged data was backed up again: {first} then {second}")
+            return False
+        
+        time.sleep(1.1)  # Backup names have one-second resolution
+        dm.save_button_state({"count": 2})
+        third = dm.create_backup()
+        if not third or third == first:
+            print("✗ Save between backups did not produce a new backup")
+            return False
+        with open(third) as f:
+            if json.load(f)["button_state"]["count"] != 2:
+                print("✗ New backup does not hold the saved state")
+                return False
+        
+        print("✓ Backup skip working")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Backup skip error: {e}")
+        return False
+    finally:
+        shutil.rmtree(BackupConfig.BACKUP_DIR, ignore_errors=True)
+
 def test_rate_limiter():
     """Test rate limiting functionality"""
     print("Testing rate limiter...")
@@ -184,6 +349,10 @@ def run_all_tests():
     tests = [
         ("Configuration Loading", test_configuration),
         ("Data Manager", test_data_manager),
+        ("Pending Writer", test_pending_writer),
+        ("Click Log Replay", test_click_log_replay),
+        ("Compaction Keeps New Clicks", test_compaction_keeps_new_clicks),
+        ("Backup Skip", test_backup_skip),
         ("Rate Limiter", test_rate_limiter),
         ("Data Persistence", test_data_persistence),
         ("Application Startup", test_app_startup),